@@ -2,12 +2,23 @@
 """Generate a minimal GitHub profile SVG."""
 
 import base64
+import bisect
+import gzip
+import hashlib
 import json
 import os
 import random
+import re
+import time
+import urllib.error
 import urllib.request
-from datetime import datetime, timezone
-from html import escape
+from calendar import timegm
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate, chain
+from operator import itemgetter
 
 
 USERNAME = "bigmacfive"
@@ -19,9 +30,14 @@ FONT_PATH = os.path.join(
     "assets",
     "Pretendard-Regular.subset.woff2",
 )
+CACHE_DIR = ".cache"
+GQL_CACHE_TTL = 600
+SIGNATURE_PATH = os.path.join(CACHE_DIR, "profile.sig")
+WRITE_BUFFER = 1 << 20
 DISPLAY_NAME = "Bigmacfive"
 PROFILE_ROLE = "Founder of snapdeck.app and kuku.mom."
-random.seed(42)
+ACTIVITY_WEEKS = 24
+RNG = random.Random(42)
 
 
 C = {
@@ -43,13 +59,53 @@ C = {
 }
 
 LANG_SHADES = ["#ffffff", "#d7d7d7", "#b6b6b6", "#969696", "#767676"]
+AI_SHADES = [C["heat3"], C["heat2"], C["heat1"]]
+HEAT_LEVELS = [C["heat0"], C["heat1"], C["heat2"], C["heat3"], C["heat4"]]
+HEAT_BOUNDS = [0, 2, 5, 9]
+HEAT_TOP = HEAT_BOUNDS[-1] + 1
+HEAT_INDEX = [bisect.bisect_left(HEAT_BOUNDS, count) for count in range(HEAT_TOP + 1)]
+HEAT_LEGEND = "".join(
+    f'<rect x="{index * 18}" width="14" height="14" rx="4" fill="{color}"/>'
+    for index, color in enumerate(HEAT_LEVELS)
+)
+MONTH_NAMES = [
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+]
+TEXT_TEMPLATE = '<text x="%s" y="%s" font-size="%s"%s fill="%s"%s>%s</text>'
+BOLD = ' font-weight="600"'
+BAR_TEMPLATE = '<rect x="%s" y="%s" width="%s" height="%s" rx="4" fill="%s"/>'
+SEGMENT_TEMPLATE = '<rect x="%s" y="%s" width="%s" height="%s" fill="%s"/>'
+SVG_OPEN = (
+    f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">'
+)
+ESCAPE_TABLE = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"}
+)
 
 
 AI_PATTERNS = [
-    r"(?i)co-?authored-?by:.*\b(claude|copilot|gpt|gemini|cursor|codeium|tabnine|amazon.?q)\b",
-    r"(?i)\b(ai|llm|copilot|claude|gpt|cursor)\s*(assisted|generated|paired|helped)",
-    r"(?i)🤖",
+    r"co-?authored-?by:.*\b(claude|copilot|gpt|gemini|cursor|codeium|tabnine|amazon.?q)\b",
+    r"\b(ai|llm|copilot|claude|gpt|cursor)\s*(assisted|generated|paired|helped)",
+    r"🤖",
 ]
+# Every AI_PATTERNS match contains one of these literals. AI_HINT_REGEX folds
+# case the same way as AI_REGEX, so a message it rejects cannot match.
+AI_HINTS = ("authored", "assisted", "generated", "paired", "helped", "🤖")
+AI_HINT_REGEX = re.compile("|".join(map(re.escape, AI_HINTS)), re.IGNORECASE)
+AI_REGEX = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in AI_PATTERNS), re.IGNORECASE
+)
 AI_NAMES = {
     "claude": "Claude",
     "copilot": "Copilot",
@@ -64,7 +120,7 @@ AI_NAMES = {
 
 
 def e(value):
-    return escape(str(value), quote=False)
+    return str(value).translate(ESCAPE_TABLE)
 
 
 def fmt_number(value):
@@ -76,6 +132,7 @@ def truncate(text, limit):
     return text if len(text) <= limit else text[: limit - 1] + "..."
 
 
+@lru_cache(maxsize=None)
 def embed_font_css():
     if not os.path.exists(FONT_PATH):
         return ""
@@ -91,28 +148,124 @@ def embed_font_css():
     )
 
 
+def read_json(response):
+    body = response.read()
+    if response.headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def write_cache(path, data):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
 def gql(query, variables=None):
     body = json.dumps(
         {"query": query, **({"variables": variables} if variables else {})}
     ).encode()
+    cache_path = os.path.join(
+        CACHE_DIR, f"gql-{hashlib.blake2b(body, digest_size=16).hexdigest()}.json"
+    )
+    try:
+        if time.time() - os.path.getmtime(cache_path) < GQL_CACHE_TTL:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if isinstance(cached, dict) and cached.get("data"):
+                return cached
+    except (OSError, ValueError):
+        pass
     req = urllib.request.Request(
         "https://api.github.com/graphql",
         data=body,
         headers={
             "Authorization": f"bearer {TOKEN}",
             "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
         },
     )
     try:
         with urllib.request.urlopen(req, timeout=30) as r:
-            return json.loads(r.read())
+            data = read_json(r)
     except Exception as err:
         print(f"GraphQL error: {err}")
         return {}
+    if data.get("data") and not data.get("errors"):
+        write_cache(cache_path, data)
+    return data
 
 
-def fetch_stats():
+def rest_get(url):
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "Accept-Encoding": "gzip",
+    }
+    if TOKEN:
+        headers["Authorization"] = f"token {TOKEN}"
+    cache_path = os.path.join(
+        CACHE_DIR, f"rest-{hashlib.blake2b(url.encode(), digest_size=16).hexdigest()}.json"
+    )
+    cached = None
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            entry = json.load(f)
+        cached = entry["body"]
+        headers["If-None-Match"] = entry["etag"]
+    except (OSError, ValueError, KeyError, TypeError):
+        cached = None
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=15) as r:
+            body = read_json(r)
+            etag = r.headers.get("ETag")
+    except urllib.error.HTTPError as err:
+        if err.code == 304 and cached is not None:
+            return cached
+        raise
+    if etag:
+        write_cache(cache_path, {"etag": etag, "body": body})
+    return body
+
+
+def days_by_date(weeks):
+    return {
+        day["date"]: day.get("contributionCount", 0)
+        for week in weeks
+        for day in week.get("contributionDays") or []
+    }
+
+
+def walk_streak(by_date, today):
+    cursor = today
+    if not by_date.get(cursor.isoformat()):
+        cursor -= timedelta(days=1)
+    streak = 0
+    while by_date.get(cursor.isoformat(), 0) > 0:
+        streak += 1
+        cursor -= timedelta(days=1)
+    return streak, cursor.isoformat()
+
+
+def fetch_year_days():
     query = """query($u:String!){
+      user(login:$u){
+        contributionsCollection{
+          contributionCalendar{weeks{contributionDays{contributionCount date}}}
+        }
+      }
+    }"""
+    data = gql(query, {"u": USERNAME})
+    user = (data.get("data") or {}).get("user") or {}
+    contributions = user.get("contributionsCollection") or {}
+    calendar = contributions.get("contributionCalendar") or {}
+    return days_by_date(calendar.get("weeks") or [])
+
+
+def fetch_stats(now):
+    query = """query($u:String!,$from:DateTime!){
       user(login:$u){
         repositories(ownerAffiliations:OWNER,first:100,orderBy:{field:STARGAZERS,direction:DESC}){
           totalCount
@@ -124,14 +277,15 @@ def fetch_stats():
         followers{totalCount}
         contributionsCollection{
           totalCommitContributions
-          contributionCalendar{
-            totalContributions
-            weeks{contributionDays{contributionCount date}}
-          }
+          contributionCalendar{totalContributions}
+        }
+        recent:contributionsCollection(from:$from){
+          contributionCalendar{weeks{contributionDays{contributionCount date}}}
         }
       }
     }"""
-    data = gql(query, {"u": USERNAME})
+    since = now - timedelta(weeks=ACTIVITY_WEEKS)
+    data = gql(query, {"u": USERNAME, "from": since.strftime("%Y-%m-%dT00:00:00Z")})
     user = (data.get("data") or {}).get("user") or {}
     repos_data = user.get("repositories") or {}
     nodes = repos_data.get("nodes") or []
@@ -143,28 +297,27 @@ def fetch_stats():
     commit_total = contributions.get("totalCommitContributions", 0)
     calendar = contributions.get("contributionCalendar") or {}
     total_contributions = calendar.get("totalContributions", 0)
-    weeks = calendar.get("weeks") or []
-
-    streak = 0
-    for week in reversed(weeks):
-        for day in reversed(week.get("contributionDays") or []):
-            if day.get("contributionCount", 0) > 0:
-                streak += 1
-            elif streak > 0:
-                break
-        else:
-            continue
-        break
-
-    lang_map = {}
+    recent = (user.get("recent") or {}).get("contributionCalendar") or {}
+    weeks = recent.get("weeks") or []
+
+    by_date = days_by_date(weeks)
+    streak, stop = walk_streak(by_date, now.date())
+    if by_date and stop < min(by_date):
+        # The streak runs past the displayed window; recount it over the
+        # default one-year calendar.
+        year_days = fetch_year_days()
+        if year_days:
+            streak, _ = walk_streak(year_days, now.date())
+
+    lang_map = Counter()
     for node in nodes:
         for edge in (node.get("languages") or {}).get("edges") or []:
             name = edge["node"]["name"]
             if name == "Makefile":
                 continue
-            lang_map[name] = lang_map.get(name, 0) + edge["size"]
+            lang_map[name] += edge["size"]
     total_size = sum(lang_map.values()) or 1
-    langs = sorted(lang_map.items(), key=lambda item: -item[1])[:6]
+    langs = lang_map.most_common(6)
     langs = [(name, size / total_size * 100) for name, size in langs]
 
     return {
@@ -180,48 +333,13 @@ def fetch_stats():
 
 
 def fetch_events():
-    url = f"https://api.github.com/users/{USERNAME}/events/public?per_page=30"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if TOKEN:
-        headers["Authorization"] = f"token {TOKEN}"
-    req = urllib.request.Request(url, headers=headers)
-    try:
-        with urllib.request.urlopen(req, timeout=15) as r:
-            events = json.loads(r.read())
-    except Exception:
-        return []
-
-    result = []
-    for event in events:
-        if event.get("type") != "PushEvent":
-            continue
-        repo = (event.get("repo") or {}).get("name", "").split("/")[-1]
-        for commit in (event.get("payload") or {}).get("commits") or []:
-            result.append(
-                {
-                    "sha": commit.get("sha", "")[:7],
-                    "repo": repo,
-                    "msg": commit.get("message", "").split("\n")[0],
-                    "ts": event.get("created_at", ""),
-                }
-            )
-    return result[:5]
-
-
-def fetch_ai_ratio():
-    import re
-
     url = f"https://api.github.com/users/{USERNAME}/events/public?per_page=100"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if TOKEN:
-        headers["Authorization"] = f"token {TOKEN}"
-    req = urllib.request.Request(url, headers=headers)
     try:
-        with urllib.request.urlopen(req, timeout=15) as r:
-            events = json.loads(r.read())
+        events = rest_get(url)
     except Exception:
-        return 0, 0, {}
+        return [], 0, 0, {}
 
+    result = []
     total = 0
     ai_count = 0
     ai_breakdown = {}
@@ -229,33 +347,56 @@ def fetch_ai_ratio():
     for event in events:
         if event.get("type") != "PushEvent":
             continue
-        for commit in (event.get("payload") or {}).get("commits") or []:
+        try:
+            commits = event["payload"]["commits"] or []
+        except (KeyError, TypeError):
+            continue
+        repo = (event.get("repo") or {}).get("name", "").split("/")[-1]
+        for commit in commits:
             total += 1
-            message = commit.get("message", "")
-            for pattern in AI_PATTERNS:
-                if not re.search(pattern, message):
-                    continue
-                ai_count += 1
+            message = commit["message"]
+            if len(result) < 5:
+                result.append(
+                    {
+                        "sha": commit["sha"][:7],
+                        "repo": repo,
+                        "msg": message.split("\n")[0],
+                        "ts": event.get("created_at", ""),
+                    }
+                )
+            if not AI_HINT_REGEX.search(message):
+                continue
+            match = AI_REGEX.search(message)
+            if not match:
+                continue
+            ai_count += 1
+            tool = match.group(1)
+            label = AI_NAMES.get(tool.lower()) if tool else None
+            if label is None:
                 lowered = message.lower()
-                matched = False
-                for keyword, label in AI_NAMES.items():
-                    if keyword in lowered:
-                        ai_breakdown[label] = ai_breakdown.get(label, 0) + 1
-                        matched = True
-                        break
-                if not matched:
-                    ai_breakdown["AI"] = ai_breakdown.get("AI", 0) + 1
-                break
-    return total, ai_count, ai_breakdown
-
-
-def reltime(iso_text):
+                label = next(
+                    (name for keyword, name in AI_NAMES.items() if keyword in lowered),
+                    "AI",
+                )
+            ai_breakdown[label] = ai_breakdown.get(label, 0) + 1
+    return result, total, ai_count, ai_breakdown
+
+
+def reltime(iso_text, now=None):
     if not iso_text:
         return ""
     try:
-        dt = datetime.fromisoformat(iso_text.replace("Z", "+00:00"))
-        diff = datetime.now(timezone.utc) - dt
-        seconds = int(diff.total_seconds())
+        stamp = timegm(
+            (
+                int(iso_text[0:4]),
+                int(iso_text[5:7]),
+                int(iso_text[8:10]),
+                int(iso_text[11:13]),
+                int(iso_text[14:16]),
+                int(iso_text[17:19]),
+            )
+        )
+        seconds = int((now or time.time()) - stamp)
         if seconds < 60:
             return "now"
         if seconds < 3600:
@@ -294,8 +435,9 @@ def svg_background():
     return f'<rect x="0" y="0" width="{W}" height="{H}" fill="{C["bg"]}"/>'
 
 
+@lru_cache(maxsize=None)
 def svg_card(x, y, w, h, radius=26):
-    return "\n".join(
+    return "".join(
         [
             f'<rect x="{x}" y="{y}" width="{w}" height="{h}" rx="{radius}" fill="{C["card"]}"/>',
             f'<rect x="{x}" y="{y}" width="{w}" height="{h}" rx="{radius}" fill="none" stroke="{C["line"]}" stroke-width="1"/>',
@@ -303,26 +445,25 @@ def svg_card(x, y, w, h, radius=26):
     )
 
 
-def svg_label(x, y, text, size=10, color=None, anchor=None):
-    fill = color or C["text_faint"]
+def svg_text(x, y, text, size, fill, anchor=None, weight=""):
     extra = f' text-anchor="{anchor}"' if anchor else ""
-    return f'<text x="{x}" y="{y}" font-size="{size}" fill="{fill}"{extra}>{e(text)}</text>'
+    return TEXT_TEMPLATE % (x, y, size, weight, fill, extra, e(text))
+
+
+def svg_label(x, y, text, size=10, color=None, anchor=None):
+    return svg_text(x, y, text, size, color or C["text_faint"], anchor)
 
 
 def svg_body(x, y, text, size=12, color=None, anchor=None):
-    fill = color or C["text_soft"]
-    extra = f' text-anchor="{anchor}"' if anchor else ""
-    return f'<text x="{x}" y="{y}" font-size="{size}" fill="{fill}"{extra}>{e(text)}</text>'
+    return svg_text(x, y, text, size, color or C["text_soft"], anchor)
 
 
 def svg_title(x, y, text, size=18):
-    return f'<text x="{x}" y="{y}" font-size="{size}" font-weight="600" fill="{C["text"]}">{e(text)}</text>'
+    return svg_text(x, y, text, size, C["text"], weight=BOLD)
 
 
 def svg_value(x, y, text, size=28, anchor=None, color=None):
-    fill = color or C["text"]
-    extra = f' text-anchor="{anchor}"' if anchor else ""
-    return f'<text x="{x}" y="{y}" font-size="{size}" font-weight="600" fill="{fill}"{extra}>{e(text)}</text>'
+    return svg_text(x, y, text, size, color or C["text"], anchor, weight=BOLD)
 
 
 def svg_divider(x1, y, x2):
@@ -336,7 +477,7 @@ def svg_metric_chip(x, y, w, h, label, value):
         svg_label(x + 18, y + 22, label, size=10),
         svg_value(x + 18, y + 52, value, size=28),
     ]
-    return "\n".join(parts)
+    return "".join(parts)
 
 
 def svg_hero(stats):
@@ -348,18 +489,16 @@ def svg_hero(stats):
     chips_y = y + 28
     streak_label = "day" if stats["streak"] == 1 else "days"
 
-    parts = [svg_card(x, y, w, h, radius=28)]
-    parts.append(svg_label(x + 28, y + 30, "GitHub profile"))
-    parts.append(svg_value(x + 28, y + 88, DISPLAY_NAME, size=52))
-    parts.append(svg_body(x + 28, y + 126, PROFILE_ROLE, size=18, color=C["text_soft"]))
+    yield svg_card(x, y, w, h, radius=28)
+    yield svg_label(x + 28, y + 30, "GitHub profile")
+    yield svg_value(x + 28, y + 88, DISPLAY_NAME, size=52)
+    yield svg_body(x + 28, y + 126, PROFILE_ROLE, size=18, color=C["text_soft"])
     meta = (
         f"Public activity only. Updated daily. Current streak: "
         f"{stats['streak']} {streak_label}."
     )
-    parts.append(svg_body(x + 28, y + 160, meta, size=11, color=C["text_faint"]))
-    parts.append(
-        f'<line x1="{chips_x - 28}" y1="{y + 28}" x2="{chips_x - 28}" y2="{y + h - 28}" stroke="{C["line"]}" stroke-width="1"/>'
-    )
+    yield svg_body(x + 28, y + 160, meta, size=11, color=C["text_faint"])
+    yield f'<line x1="{chips_x - 28}" y1="{y + 28}" x2="{chips_x - 28}" y2="{y + h - 28}" stroke="{C["line"]}" stroke-width="1"/>'
 
     chips = [
         ("Contributions", fmt_number(stats["total"])),
@@ -372,57 +511,46 @@ def svg_hero(stats):
         col = index % 2
         chip_x = chips_x + col * (chip_w + chip_gap)
         chip_y = chips_y + row * (chip_h + chip_gap)
-        parts.append(svg_metric_chip(chip_x, chip_y, chip_w, chip_h, label, value))
-    return "\n".join(parts)
+        yield svg_metric_chip(chip_x, chip_y, chip_w, chip_h, label, value)
 
 
 def svg_activity(weeks, total):
     x, y, w, h = 290, 32, 528, 256
-    parts = [svg_card(x, y, w, h)]
-    parts.append(svg_label(x + 24, y + 30, "Contribution activity"))
-    parts.append(svg_title(x + 24, y + 64, "Last 24 weeks", size=22))
-    parts.append(
-        svg_body(
-            x + 24,
-            y + 92,
-            f"{fmt_number(total)} contributions.",
-            size=12,
-        )
+    yield svg_card(x, y, w, h)
+    yield svg_label(x + 24, y + 30, "Contribution activity")
+    yield svg_title(x + 24, y + 64, f"Last {ACTIVITY_WEEKS} weeks", size=22)
+    yield svg_body(
+        x + 24,
+        y + 92,
+        f"{fmt_number(total)} contributions.",
+        size=12,
     )
 
-    display_weeks = weeks[-24:] if len(weeks) >= 24 else weeks
+    display_weeks = weeks[-ACTIVITY_WEEKS:]
     cell = 10
     gap = 3
     step = cell + gap
     grid_w = len(display_weeks) * step
     grid_x = x + 80 + max(0, (w - 120 - grid_w) // 2)
     grid_y = y + 116
-    levels = [C["heat0"], C["heat1"], C["heat2"], C["heat3"], C["heat4"]]
-    month_names = [
-        "Jan",
-        "Feb",
-        "Mar",
-        "Apr",
-        "May",
-        "Jun",
-        "Jul",
-        "Aug",
-        "Sep",
-        "Oct",
-        "Nov",
-        "Dec",
-    ]
+    radius = 4
+    edge = cell - 2 * radius
+    cell_path = (
+        f"M%d,%dh{edge}a{radius},{radius} 0 0 1 {radius},{radius}v{edge}"
+        f"a{radius},{radius} 0 0 1-{radius},{radius}h-{edge}"
+        f"a{radius},{radius} 0 0 1-{radius}-{radius}v-{edge}"
+        f"a{radius},{radius} 0 0 1 {radius}-{radius}z"
+    )
+    cells_by_level = [[] for _ in HEAT_LEVELS]
 
     for label, row in [("Mon", 1), ("Wed", 3), ("Fri", 5)]:
-        parts.append(
-            svg_label(
-                grid_x - 14,
-                grid_y + row * step + 8,
-                label,
-                size=9,
-                color=C["text_faint"],
-                anchor="end",
-            )
+        yield svg_label(
+            grid_x - 14,
+            grid_y + row * step + 8,
+            label,
+            size=9,
+            color=C["text_faint"],
+            anchor="end",
         )
 
     last_month = None
@@ -430,49 +558,39 @@ def svg_activity(weeks, total):
         days = week.get("contributionDays") or []
         if days:
             try:
-                dt = datetime.fromisoformat(days[0]["date"])
-                if dt.month != last_month:
-                    last_month = dt.month
-                    parts.append(
-                        svg_label(
-                            grid_x + week_index * step,
-                            grid_y - 18,
-                            month_names[dt.month - 1],
-                            size=10,
-                        )
+                month = int(days[0]["date"][5:7])
+                if month != last_month:
+                    last_month = month
+                    yield svg_label(
+                        grid_x + week_index * step,
+                        grid_y - 18,
+                        MONTH_NAMES[month - 1],
+                        size=10,
                     )
             except Exception:
                 pass
+        cx = grid_x + week_index * step + radius
         for day_index, day in enumerate(days):
             count = day.get("contributionCount", 0)
-            level = (
-                0
-                if count == 0
-                else (1 if count <= 2 else (2 if count <= 5 else (3 if count <= 9 else 4)))
-            )
-            cx = grid_x + week_index * step
-            cy = grid_y + day_index * step
-            parts.append(
-                f'<rect x="{cx}" y="{cy}" width="{cell}" height="{cell}" rx="4" fill="{levels[level]}"/>'
-            )
+            level = HEAT_INDEX[min(count, HEAT_TOP)]
+            cells_by_level[level].append(cell_path % (cx, grid_y + day_index * step))
+
+    for color, cells in zip(HEAT_LEVELS, cells_by_level):
+        if cells:
+            yield f'<path fill="{color}" d="{"".join(cells)}"/>'
 
     legend_x = x + w - 166
     legend_y = y + h - 44
-    parts.append(svg_label(legend_x - 30, legend_y + 11, "Low", size=10))
-    for index, color in enumerate(levels):
-        lx = legend_x + index * 18
-        parts.append(
-            f'<rect x="{lx}" y="{legend_y}" width="14" height="14" rx="4" fill="{color}"/>'
-        )
-    parts.append(svg_label(legend_x + 98, legend_y + 11, "High", size=10))
-    return "\n".join(parts)
+    yield svg_label(legend_x - 30, legend_y + 11, "Low", size=10)
+    yield f'<g transform="translate({legend_x},{legend_y})">{HEAT_LEGEND}</g>'
+    yield svg_label(legend_x + 98, legend_y + 11, "High", size=10)
 
 
 def svg_languages(langs):
     x, y, w, h = 32, 32, 240, 256
-    parts = [svg_card(x, y, w, h)]
-    parts.append(svg_label(x + 24, y + 30, "Language mix"))
-    parts.append(svg_title(x + 24, y + 64, "Languages", size=22))
+    yield svg_card(x, y, w, h)
+    yield svg_label(x + 24, y + 30, "Language mix")
+    yield svg_title(x + 24, y + 64, "Languages", size=22)
 
     start_y = y + 96
     row_gap = 26
@@ -480,169 +598,156 @@ def svg_languages(langs):
     bar_w = w - 118 - 24
 
     if not langs:
-        parts.append(svg_body(x + 24, y + 126, "No language data available.", size=12))
-        return "\n".join(parts)
+        yield svg_body(x + 24, y + 126, "No language data available.", size=12)
+        return
 
-    for index, (name, pct) in enumerate(langs[:5]):
+    for index, ((name, pct), color) in enumerate(zip(langs, LANG_SHADES)):
         row_y = start_y + index * row_gap
-        color = LANG_SHADES[min(index, len(LANG_SHADES) - 1)]
         fill_w = max(6, int(bar_w * pct / 100))
-        parts.append(svg_body(x + 24, row_y, name, size=12, color=C["text"]))
-        parts.append(
-            f'<rect x="{bar_x}" y="{row_y - 9}" width="{bar_w}" height="8" rx="4" fill="{C["line"]}"/>'
-        )
-        parts.append(
-            f'<rect x="{bar_x}" y="{row_y - 10}" width="{fill_w}" height="8" rx="4" fill="{color}"/>'
-        )
-    return "\n".join(parts)
+        yield svg_body(x + 24, row_y, name, size=12, color=C["text"])
+        yield BAR_TEMPLATE % (bar_x, row_y - 9, bar_w, 8, C["line"])
+        yield BAR_TEMPLATE % (bar_x, row_y - 10, fill_w, 8, color)
 
 
-def svg_recent_work(events):
+def svg_recent_work(events, now):
     x, y, w, h = 330, 32, 488, 256
-    parts = [svg_card(x, y, w, h)]
-    parts.append(svg_label(x + 24, y + 30, "Latest public push events"))
-    parts.append(svg_title(x + 24, y + 64, "Recent work", size=22))
+    yield svg_card(x, y, w, h)
+    yield svg_label(x + 24, y + 30, "Latest public push events")
+    yield svg_title(x + 24, y + 64, "Recent work", size=22)
 
     if not events:
-        parts.append(
-            svg_body(
-                x + 24,
-                y + 116,
-                "No recent public push events.",
-                size=13,
-                color=C["text_soft"],
-            )
+        yield svg_body(
+            x + 24,
+            y + 116,
+            "No recent public push events.",
+            size=13,
+            color=C["text_soft"],
         )
-        parts.append(
-            svg_body(
-                x + 24,
-                y + 140,
-                "This section updates when public commits appear on GitHub.",
-                size=12,
-                color=C["text_faint"],
-            )
+        yield svg_body(
+            x + 24,
+            y + 140,
+            "This section updates when public commits appear on GitHub.",
+            size=12,
+            color=C["text_faint"],
         )
-        return "\n".join(parts)
+        return
 
-    parts.append(svg_label(x + 24, y + 96, "Repository", size=10))
-    parts.append(svg_label(x + 164, y + 96, "Update", size=10))
-    parts.append(
-        svg_label(x + w - 24, y + 96, "When", size=10, color=C["text_faint"], anchor="end")
-    )
+    yield svg_label(x + 24, y + 96, "Repository", size=10)
+    yield svg_label(x + 164, y + 96, "Update", size=10)
+    yield svg_label(x + w - 24, y + 96, "When", size=10, color=C["text_faint"], anchor="end")
 
     row_h = 30
     start_y = y + 126
+    epoch = now.timestamp()
     for index, event in enumerate(events[:4]):
         row_y = start_y + index * row_h
         if index > 0:
-            parts.append(svg_divider(x + 24, row_y - 16, x + w - 24))
+            yield svg_divider(x + 24, row_y - 16, x + w - 24)
         repo = truncate(event["repo"], 18)
         msg = truncate(event["msg"], 34)
-        when = reltime(event["ts"])
-        parts.append(svg_body(x + 24, row_y, repo, size=12, color=C["text"]))
-        parts.append(svg_body(x + 154, row_y, msg, size=12, color=C["text"]))
-        parts.append(svg_body(x + w - 24, row_y, when, size=12, color=C["text_soft"], anchor="end"))
-    return "\n".join(parts)
+        when = reltime(event["ts"], epoch)
+        yield svg_body(x + 24, row_y, repo, size=12, color=C["text"])
+        yield svg_body(x + 154, row_y, msg, size=12, color=C["text"])
+        yield svg_body(x + w - 24, row_y, when, size=12, color=C["text_soft"], anchor="end")
 
 
-def svg_footer(total, ai_count, ai_breakdown):
+def svg_footer(total, ai_count, ai_breakdown, now):
     x, y, w, h = 32, 840, 786, 82
     bar_x = x + 24
     bar_y = y + 60
     bar_w = w - 48
     bar_h = 8
-    updated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    updated = now.strftime("%Y-%m-%d %H:%M UTC")
 
-    parts = [svg_card(x, y, w, h, radius=22)]
-    parts.append(svg_label(x + 24, y + 28, "Working style"))
-    parts.append(
-        svg_label(x + w - 24, y + 28, f"Updated {updated}", size=10, anchor="end")
-    )
+    yield svg_card(x, y, w, h, radius=22)
+    yield svg_label(x + 24, y + 28, "Working style")
+    yield svg_label(x + w - 24, y + 28, f"Updated {updated}", size=10, anchor="end")
 
     if total <= 0:
-        parts.append(
-            f'<rect x="{bar_x}" y="{bar_y}" width="{bar_w}" height="{bar_h}" rx="4" fill="{C["line"]}"/>'
-        )
-        parts.append(
-            f'<rect x="{bar_x}" y="{bar_y}" width="{bar_w * 0.92:.1f}" height="{bar_h}" rx="4" fill="{C["heat2"]}"/>'
-        )
-        parts.append(
-            svg_body(
-                x + 24,
-                y + 46,
-                "No AI-assist footers detected in recent public commits.",
-                size=12,
-                color=C["text_soft"],
-            )
-        )
-        return "\n".join(parts)
-
-    manual_count = max(0, total - ai_count)
-    manual_pct = manual_count / total * 100
-    parts.append(
-        svg_body(
+        yield BAR_TEMPLATE % (bar_x, bar_y, bar_w, bar_h, C["line"])
+        yield BAR_TEMPLATE % (bar_x, bar_y, round(bar_w * 0.92, 1), bar_h, C["heat2"])
+        yield svg_body(
             x + 24,
             y + 46,
-            f"Manual share {manual_pct:.0f}%",
+            "No AI-assist footers detected in recent public commits.",
             size=12,
             color=C["text_soft"],
         )
-    )
-    parts.append(
-        f'<rect x="{bar_x}" y="{bar_y}" width="{bar_w}" height="{bar_h}" rx="4" fill="{C["line"]}"/>'
-    )
-    parts.append(
-        f'<rect x="{bar_x}" y="{bar_y}" width="{bar_w * manual_count / total:.1f}" height="{bar_h}" rx="4" fill="{C["heat4"]}"/>'
-    )
+        return
 
-    cursor_x = bar_x + bar_w * manual_count / total
-    sorted_breakdown = sorted(ai_breakdown.items(), key=lambda item: -item[1])[:3]
-    for index, (name, count) in enumerate(sorted_breakdown):
-        width = bar_w * count / total
-        color = [C["heat3"], C["heat2"], C["heat1"]][min(index, 2)]
-        parts.append(
-            f'<rect x="{cursor_x:.1f}" y="{bar_y}" width="{width:.1f}" height="{bar_h}" fill="{color}"/>'
+    manual_count = max(0, total - ai_count)
+    to_pct = 100 / total
+    manual_pct = manual_count * to_pct
+    yield svg_body(
+        x + 24,
+        y + 46,
+        f"Manual share {manual_pct:.0f}%",
+        size=12,
+        color=C["text_soft"],
+    )
+    yield BAR_TEMPLATE % (bar_x, bar_y, bar_w, bar_h, C["line"])
+    sorted_breakdown = sorted(
+        ai_breakdown.items(), key=itemgetter(1), reverse=True
+    )[:3]
+    counts = [manual_count] + [count for _, count in sorted_breakdown]
+    cuts = [round(bar_w * running / total) for running in accumulate(counts)]
+    yield BAR_TEMPLATE % (bar_x, bar_y, cuts[0], bar_h, C["heat4"])
+    for index, color in enumerate(AI_SHADES[: len(sorted_breakdown)]):
+        yield SEGMENT_TEMPLATE % (
+            bar_x + cuts[index],
+            bar_y,
+            cuts[index + 1] - cuts[index],
+            bar_h,
+            color,
         )
-        cursor_x += width
 
     if sorted_breakdown:
         summary = " | ".join(
-            f"{name} {count / total * 100:.0f}%"
+            f"{name} {count * to_pct:.0f}%"
             for name, count in sorted_breakdown
         )
     else:
         summary = "No AI-assist footers detected."
-    parts.append(
-        svg_body(
-            x + w - 24,
-            y + 44,
-            truncate(summary, 40),
-            size=11,
-            color=C["text_faint"],
-            anchor="end",
+    yield svg_body(
+        x + w - 24,
+        y + 44,
+        truncate(summary, 40),
+        size=11,
+        color=C["text_faint"],
+        anchor="end",
+    )
+
+def input_signature(*inputs):
+    digest = hashlib.blake2b(digest_size=16)
+    for path in (__file__, FONT_PATH):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    digest.update(json.dumps(inputs, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def write_svg(f, stats, events, total, ai_count, ai_breakdown):
+    f.writelines(
+        chain(
+            (SVG_OPEN, svg_defs(), svg_background()),
+            svg_languages(stats["langs"]),
+            svg_activity(stats["weeks"], stats["total"]),
+            ("</svg>",),
         )
     )
-    return "\n".join(parts)
-
-def generate_svg(stats, events, total, ai_count, ai_breakdown):
-    sections = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">',
-        svg_defs(),
-        svg_background(),
-        svg_languages(stats["langs"]),
-        svg_activity(stats["weeks"], stats["total"]),
-        "</svg>",
-    ]
-    return "\n".join(sections)
 
 
 def main():
     print(f"Generating profile card for {USERNAME}...")
 
+    now = datetime.now(timezone.utc)
     if TOKEN:
-        stats = fetch_stats()
-        events = fetch_events()
-        total, ai_count, ai_breakdown = fetch_ai_ratio()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            stats_job = pool.submit(fetch_stats, now)
+            events_job = pool.submit(fetch_events)
+            stats = stats_job.result()
+            events, total, ai_count, ai_breakdown = events_job.result()
     else:
         print("No GITHUB_TOKEN - using placeholder data")
         stats = {
@@ -664,7 +769,7 @@ def main():
                 {
                     "contributionDays": [
                         {
-                            "contributionCount": random.randint(0, 12),
+                            "contributionCount": RNG.randint(0, 12),
                             "date": f"2025-01-{day+1:02d}",
                         }
                         for day in range(7)
@@ -701,10 +806,28 @@ def main():
         ]
         total, ai_count, ai_breakdown = 100, 18, {"Cursor": 10, "Claude": 5, "GPT": 3}
 
-    svg = generate_svg(stats, events, total, ai_count, ai_breakdown)
-    with open("profile.svg", "w") as f:
-        f.write(svg)
-    print(f"Done! profile.svg ({len(svg):,} bytes)")
+    signature = input_signature(stats, events, total, ai_count, ai_breakdown)
+    if os.path.exists("profile.svg") and os.path.exists(SIGNATURE_PATH):
+        with open(SIGNATURE_PATH, encoding="utf-8") as f:
+            if f.read() == signature:
+                print("Inputs unchanged - keeping profile.svg")
+                return
+
+    # Drop the old signature first so a run that dies between the SVG and
+    # signature writes can't pair a new profile.svg with stale inputs.
+    try:
+        os.remove(SIGNATURE_PATH)
+    except FileNotFoundError:
+        pass
+    with open(
+        "profile.svg.tmp", "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER
+    ) as f:
+        write_svg(f, stats, events, total, ai_count, ai_breakdown)
+    os.replace("profile.svg.tmp", "profile.svg")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SIGNATURE_PATH, "w", encoding="utf-8") as f:
+        f.write(signature)
+    print(f"Done! profile.svg ({os.path.getsize('profile.svg'):,} bytes)")
 
 
 if __name__ == "__main__":